@@ -1,143 +1,538 @@
 import pandas as pd
 import numpy as np
+from collections import namedtuple
 from datetime import datetime
 import json
 import os
+from allocation import allocate_reorders
+from datafiles import DEMAND_COLUMNS, INVENTORY_COLUMNS, first_rows, read_table
+from rollups import DecisionRollups, DEFAULT_UNIT_PRICE
+
+DECISION_LOG_FORMAT = 2
+
+# Reason templates, indexed by the reason_id stored on each decision record.
+# The risk level of a compact record is the level its template belongs to.
+REASON_TEMPLATES = (
+    ('High', "Critical: Stock will run out in {days_of_stock} days, but lead time is {lead_time_days} days. Risk factor {risk_factor} indicates imminent stockout. Recommended reorder: {reorder_qty} units to cover demand during lead time."),
+    ('Medium', "Moderate risk: {days_of_stock} days of stock with {lead_time_days} day lead time. Risk factor {risk_factor} suggests proactive restocking of {reorder_qty} units."),
+    ('Low', "Low risk: {days_of_stock} days of stock available, well above {lead_time_days} day lead time. Risk factor {risk_factor} is acceptable."),
+    ('High', "Critical: Stock will run out in {days_of_stock} days, but lead time is {lead_time_days} days. Risk factor {risk_factor} indicates imminent stockout. Reorder limited to {reorder_qty} units by the catalog budget and space allocation."),
+    ('Medium', "Moderate risk: {days_of_stock} days of stock with {lead_time_days} day lead time. Risk factor {risk_factor} suggests proactive restocking; reorder limited to {reorder_qty} units by the catalog budget and space allocation."),
+)
+# Risk levels in risk_code order, as returned by score_risk
+RISK_LEVELS = ('High', 'Medium', 'Low')
+REASON_IDS = {level: i for i, level in enumerate(RISK_LEVELS)}
+# Used when the allocation stage trims a reorder below what the product asked for
+ALLOCATED_REASON_IDS = {'High': 3, 'Medium': 4}
+
+# Compact decision: numbers only, plus an index into the interned product table.
+# Human-readable `action` and `reason` are rendered on demand by render_decision.
+DecisionRecord = namedtuple('DecisionRecord', [
+    'product_ref', 'timestamp', 'observed_stock', 'daily_demand', 'days_of_stock',
+    'lead_time_days', 'risk_factor', 'reorder_qty', 'reason_id'
+])
+# Multi-location decisions are stored column-wise, one batch per run_all_locations
+# call: a shared timestamp plus one array per column, `location` being the store key.
+# Columns are loaded with these dtypes, so an empty logged list doesn't become float.
+LOCATION_DECISION_DTYPES = {
+    'product_ref': np.int64, 'location': object, 'observed_stock': np.int64, 'daily_demand': float,
+    'days_of_stock': float, 'lead_time_days': np.int64, 'risk_factor': float, 'reorder_qty': np.int64,
+    'reason_id': np.int64
+}
+LOCATION_DECISION_COLUMNS = tuple(LOCATION_DECISION_DTYPES)
+
+
+# Risk policy: risk-factor cut-offs, lead-time demand cover per level, and the
+# share of free capacity to order when the cover rule yields nothing. Fields may
+# also be NumPy arrays, which score_risk broadcasts (see scenarios.py).
+RiskPolicy = namedtuple('RiskPolicy', [
+    'high_threshold', 'medium_threshold', 'high_cover', 'medium_cover', 'high_fill', 'medium_fill'
+], defaults=[1.0, 0.5, 1.5, 2.0, 0.8, 0.5])
+DEFAULT_POLICY = RiskPolicy()
+
+
+def _plain(value):
+    # numpy scalars -> int/float so records serialize and format like the originals
+    return value.item() if hasattr(value, 'item') else value
+
+
+def format_action(reorder_qty):
+    return f'Reorder {reorder_qty} units' if reorder_qty > 0 else 'No Action'
+
+
+def score_risk(current_stock, daily_demand, lead_time, max_capacity, policy=DEFAULT_POLICY):
+    # Vectorized calculate_risk + make_decision sizing. Inputs may be arrays of
+    # any broadcastable shape; risk_code indexes RISK_LEVELS (0=High, 1=Medium, 2=Low).
+    current_stock = np.asarray(current_stock, dtype=float)
+    daily_demand = np.asarray(daily_demand, dtype=float)
+    lead_time = np.asarray(lead_time, dtype=float)
+    max_capacity = np.asarray(max_capacity, dtype=float)
+    
+    no_demand = daily_demand == 0
+    # NaN demand (a product without a demand row) is unknown: scored Low, never
+    # reordered, with NaN days of stock and risk factor
+    unknown = np.isnan(daily_demand)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_stock = np.where(no_demand, 999, current_stock / daily_demand)
+        risk_factor = np.where(no_demand, 0, np.where(days_of_stock > 0, lead_time / days_of_stock, 999))
+    risk_factor = np.where(unknown, np.nan, risk_factor)
+    
+    high = risk_factor >= policy.high_threshold
+    medium = ~high & (risk_factor >= policy.medium_threshold)
+    risk_code = np.where(high, 0, np.where(medium, 1, 2)).astype(np.int8)
+    
+    # Cover a multiple of lead-time demand; fall back to a share of free capacity
+    cover = np.where(high, policy.high_cover, np.where(medium, policy.medium_cover, 0.0))
+    fill = np.where(high, policy.high_fill, np.where(medium, policy.medium_fill, 0.0))
+    reorder_qty = np.maximum(0, np.trunc(daily_demand * lead_time * cover - current_stock))
+    fallback = np.maximum(0, np.trunc((max_capacity - current_stock) * fill))
+    reorder_qty = np.where(reorder_qty == 0, fallback, reorder_qty)
+    # Low risk (including unknown demand) never reorders, even on negative stock
+    reorder_qty = np.where(risk_code == 2, 0, reorder_qty)
+    
+    return {
+        'days_of_stock': np.round(days_of_stock, 2),
+        'risk_factor': np.round(risk_factor, 2),
+        'risk_code': risk_code,
+        'reorder_qty': reorder_qty.astype(np.int64)
+    }
+
 
 class InventoryAgent:
-    def __init__(self, inventory_file, demand_file, decision_log_file='decisions.json'):
-        # Handle both compressed and regular CSV files
-        if inventory_file.endswith('.gz'):
-            self.inventory = pd.read_csv(inventory_file, compression='gzip')
-        else:
-            self.inventory = pd.read_csv(inventory_file)
-        
-        self.demand = pd.read_csv(demand_file)
+    def __init__(self, inventory_file, demand_file, decision_log_file='decisions.json', policy=None):
+        # CSV (plain or .gz), Parquet or memory-mapped Arrow; only the columns the agent uses are read
+        self.inventory = read_table(inventory_file, INVENTORY_COLUMNS)
+        self.demand = read_table(demand_file, DEMAND_COLUMNS)
+        # Memory-mapped columns are read-only; stock is the one column updated in place
+        self.inventory['current_stock'] = self.inventory['current_stock'].to_numpy().copy()
+        self.inventory_file = inventory_file
         self.decision_log_file = decision_log_file
+        self.policy = policy or DEFAULT_POLICY
+        
+        # Row lookup and per-row demand for the vectorized paths (first match wins, as in calculate_risk)
+        self._row_index = pd.Index(self.inventory['product_id'])
+        demand_rows = first_rows(self.inventory['product_id'], self.demand['product_id'])
+        # Products without a demand row (-1) pick up the trailing NaN
+        self._row_demand = np.append(self.demand['daily_demand'].to_numpy(dtype=float), np.nan)[demand_rows]
+        # Old-format dict records are kept verbatim; new ones are DecisionRecords
         self.decisions = []
+        self._products = []
+        self._product_refs = {}
+        self._last_decision = {}
+        self.location_decisions = []
+        self._location_batch_json = []
         self._load_decisions()
         
+        # Overview analytics live next to the decision log; build them once from
+        # the log if they don't exist yet, then keep them updated on every append
+        self.rollups = DecisionRollups(os.path.splitext(decision_log_file)[0] + '_rollups.json')
+        if not self.rollups.load():
+            for decision in self.decisions:
+                self._rollup_decision(decision)
+            for batch in self.location_decisions:
+                self._rollup_location_batch(batch)
+        self._refresh_stock_value()
+        self._refresh_risk_counts()
+        
+    def _intern_product(self, product_id, product_name):
+        ref = self._product_refs.get(product_id)
+        if ref is None:
+            ref = len(self._products)
+            self._products.append((product_id, product_name))
+            self._product_refs[product_id] = ref
+        return ref
+    
+    def _decision_product_id(self, decision):
+        if isinstance(decision, DecisionRecord):
+            return self._products[decision.product_ref][0]
+        return decision['product_id']
+    
+    def _rollup_decision(self, decision):
+        if isinstance(decision, DecisionRecord):
+            self.rollups.add_decision(decision.timestamp, REASON_TEMPLATES[decision.reason_id][0], decision.reorder_qty)
+        else:
+            self.rollups.add_decision(decision['timestamp'], decision['risk_level'], decision['reorder_qty'])
+    
+    def _rollup_location_batch(self, batch):
+        # One rollup update per risk level instead of one per cell
+        codes = batch['reason_id']
+        reorder_qty = batch['reorder_qty']
+        n = len(RISK_LEVELS)
+        decisions = np.bincount(codes, minlength=n)
+        reorders = np.bincount(codes, weights=reorder_qty > 0, minlength=n).astype(np.int64)
+        units = np.bincount(codes, weights=np.maximum(reorder_qty, 0), minlength=n).astype(np.int64)
+        for level, count, reordered, total in zip(RISK_LEVELS, decisions.tolist(), reorders.tolist(), units.tolist()):
+            if count:
+                self.rollups.add_decisions(batch['timestamp'], level, count, reordered, total)
+    
+    def _add_location_batch(self, batch, serialized=None):
+        self.location_decisions.append(batch)
+        # Batches never change once logged, so each is serialized only once
+        if serialized is None:
+            serialized = json.dumps({name: value.tolist() if isinstance(value, np.ndarray) else value
+                                     for name, value in batch.items()}, separators=(',', ':'))
+        self._location_batch_json.append(serialized)
+    
+    def _stock_category(self, inv):
+        return inv['category'] if 'category' in self.inventory.columns else 'All Products'
+    
+    def _unit_price(self, inv):
+        return inv['unit_cost'] if 'unit_cost' in self.inventory.columns else DEFAULT_UNIT_PRICE
+    
+    def _refresh_stock_value(self):
+        # The loaded inventory is the source of truth for stock on hand
+        price = self.inventory['unit_cost'] if 'unit_cost' in self.inventory.columns else DEFAULT_UNIT_PRICE
+        value = self.inventory['current_stock'] * price
+        if 'category' in self.inventory.columns:
+            values = value.groupby(self.inventory['category']).sum().to_dict()
+        else:
+            values = {'All Products': value.sum()}
+        self.rollups.set_stock_value(values)
+    
+    def _refresh_risk_counts(self):
+        # Re-based on the loaded inventory, then shifted as stock changes
+        counts = np.bincount(self.score_all()['risk_code'], minlength=len(RISK_LEVELS))
+        self.rollups.set_risk_counts(dict(zip(RISK_LEVELS, counts.tolist())))
+    
+    def _shift_risk_counts(self, previous_codes, codes):
+        deltas = np.bincount(codes, minlength=len(RISK_LEVELS)) - np.bincount(previous_codes, minlength=len(RISK_LEVELS))
+        if deltas.any():
+            self.rollups.add_risk_counts(dict(zip(RISK_LEVELS, deltas.tolist())))
+    
+    def _append_decision(self, decision, rollup=True):
+        self.decisions.append(decision)
+        if rollup:
+            self._rollup_decision(decision)
+        self._last_decision[self._decision_product_id(decision)] = decision
+    
     def _load_decisions(self):
         if os.path.exists(self.decision_log_file):
             with open(self.decision_log_file, 'r') as f:
-                self.decisions = json.load(f)
+                data = json.load(f)
+            
+            # Format 1 was a plain list of fully rendered dicts
+            if isinstance(data, list):
+                data = {'products': [], 'legacy': data, 'records': []}
+            
+            for product_id, product_name in data['products']:
+                self._intern_product(product_id, product_name)
+            for decision in data['legacy']:
+                self._append_decision(decision, rollup=False)
+            for row in data['records']:
+                self._append_decision(DecisionRecord(*row), rollup=False)
+            for batch in data.get('location_batches', []):
+                columns = {name: np.asarray(batch[name], dtype=dtype) for name, dtype in LOCATION_DECISION_DTYPES.items()}
+                self._add_location_batch(dict(columns, timestamp=batch['timestamp']))
     
-    def _save_decisions(self):
+    def save_decisions(self):
+        data = {
+            'format': DECISION_LOG_FORMAT,
+            'products': self._products,
+            'legacy': [d for d in self.decisions if not isinstance(d, DecisionRecord)],
+            'records': [d for d in self.decisions if isinstance(d, DecisionRecord)]
+        }
+        text = json.dumps(data, separators=(',', ':'))
+        if self._location_batch_json:
+            # Splice in the pre-serialized location batches before the closing brace
+            text = text[:-1] + ',"location_batches":[' + ','.join(self._location_batch_json) + ']}'
         with open(self.decision_log_file, 'w') as f:
-            json.dump(self.decisions, f, indent=2)
+            f.write(text)
+        self.rollups.save()
     
-    def calculate_risk(self, product_id):
-        inv = self.inventory[self.inventory['product_id'] == product_id].iloc[0]
-        dem = self.demand[self.demand['product_id'] == product_id].iloc[0]
+    def render_decision(self, decision):
+        # Old-format dicts already carry their rendered text and pass through as-is
+        if not isinstance(decision, DecisionRecord):
+            return decision
         
-        daily_demand = dem['daily_demand']
-        current_stock = inv['current_stock']
-        lead_time = inv['lead_time_days']
+        product_id, product_name = self._products[decision.product_ref]
+        risk_level, template = REASON_TEMPLATES[decision.reason_id]
+        return {
+            'product_id': product_id,
+            'product_name': product_name,
+            'timestamp': datetime.fromtimestamp(decision.timestamp).isoformat(),
+            'observed_stock': decision.observed_stock,
+            'daily_demand': decision.daily_demand,
+            'days_of_stock': decision.days_of_stock,
+            'lead_time_days': decision.lead_time_days,
+            'risk_factor': decision.risk_factor,
+            'risk_level': risk_level,
+            'action': format_action(decision.reorder_qty),
+            'reorder_qty': decision.reorder_qty,
+            'reason': template.format(**decision._asdict())
+        }
+    
+    def get_decision_action(self, decision):
+        if not isinstance(decision, DecisionRecord):
+            return decision['action']
+        return format_action(decision.reorder_qty)
+    
+    def export_decisions(self):
+        return [self.render_decision(d) for d in self.decisions]
+    
+    def _product_rows(self, product_id):
+        # Inventory rows of a product, in file order; decisions use the first one
+        rows = np.sort(self._row_index.get_indexer_for([product_id]))
+        if not len(rows) or rows[0] < 0:
+            raise ValueError(f"Unknown product: {product_id}")
+        return rows
+    
+    def calculate_risk(self, product_id):
+        # Scalar view of score_risk for one product, so both paths share one policy
+        row = self._product_rows(product_id)[:1]
+        inputs = self.risk_inputs(row)
+        scores = score_risk(**inputs, policy=self.policy)
         
+        daily_demand = inputs['daily_demand'][0]
+        days_of_stock = _plain(scores['days_of_stock'][0])
+        risk_factor = _plain(scores['risk_factor'][0])
+        # The no-demand and no-stock sentinels are ints, as they always were
         if daily_demand == 0:
-            days_of_stock = 999
-            risk_factor = 0
-        else:
-            days_of_stock = current_stock / daily_demand
-            risk_factor = lead_time / days_of_stock if days_of_stock > 0 else 999
-        
-        if risk_factor >= 1.0:
-            risk_level = 'High'
-        elif risk_factor >= 0.5:
-            risk_level = 'Medium'
-        else:
-            risk_level = 'Low'
+            days_of_stock, risk_factor = 999, 0
+        elif risk_factor == 999:
+            risk_factor = 999
         
         return {
-            'days_of_stock': round(days_of_stock, 2),
-            'risk_factor': round(risk_factor, 2),
-            'risk_level': risk_level,
-            'current_stock': current_stock,
+            'days_of_stock': days_of_stock,
+            'risk_factor': risk_factor,
+            'risk_level': RISK_LEVELS[scores['risk_code'][0]],
+            'current_stock': inputs['current_stock'][0],
             'daily_demand': daily_demand,
-            'lead_time': lead_time
+            'lead_time': inputs['lead_time'][0],
+            'reorder_qty': _plain(scores['reorder_qty'][0])
         }
     
-    def make_decision(self, product_id):
-        risk_info = self.calculate_risk(product_id)
-        inv = self.inventory[self.inventory['product_id'] == product_id].iloc[0]
+    def risk_inputs(self, rows=None):
+        # Row-aligned arrays the vectorized risk engine works on
+        rows = slice(None) if rows is None else rows
+        return {
+            'current_stock': self.inventory['current_stock'].to_numpy()[rows],
+            'daily_demand': self._row_demand[rows],
+            'lead_time': self.inventory['lead_time_days'].to_numpy()[rows],
+            'max_capacity': self.inventory['max_capacity'].to_numpy()[rows]
+        }
+    
+    def score_all(self, rows=None):
+        # Vectorized risk and reorder sizing for every inventory row (or just `rows`), in row order
+        inputs = self.risk_inputs(rows)
+        scores = score_risk(**inputs, policy=self.policy)
+        scores['daily_demand'] = inputs['daily_demand']
+        return scores
+    
+    def apply_stock_deltas(self, product_ids, deltas):
+        # Apply net stock movements (sales negative, receipts positive) and
+        # re-score only the products they touch. Unknown product ids are ignored.
+        rows = self._row_index.get_indexer(product_ids)
+        known = rows >= 0
+        rows = rows[known]
+        deltas = np.asarray(deltas)[known].astype(np.int64)
         
-        action = 'No Action'
-        reorder_qty = 0
-        reason = ''
+        previous = self.score_all(rows)['risk_code']
+        stock = self.inventory['current_stock'].to_numpy()[rows] + deltas
+        self.inventory.iloc[rows, self.inventory.columns.get_loc('current_stock')] = stock
+        scores = self.score_all(rows)
         
-        if risk_info['risk_level'] == 'High':
-            # Calculate optimal reorder: cover lead time + safety buffer
-            safety_stock = risk_info['daily_demand'] * risk_info['lead_time'] * 1.5
-            reorder_qty = max(0, int(safety_stock - inv['current_stock']))
-            
-            # If still 0, at least reorder to max capacity
-            if reorder_qty == 0:
-                reorder_qty = int((inv['max_capacity'] - inv['current_stock']) * 0.8)
-            
-            action = f'Reorder {reorder_qty} units' if reorder_qty > 0 else 'No Action'
-            reason = f"Critical: Stock will run out in {risk_info['days_of_stock']} days, but lead time is {risk_info['lead_time']} days. Risk factor {risk_info['risk_factor']} indicates imminent stockout. Recommended reorder: {reorder_qty} units to cover demand during lead time."
-        elif risk_info['risk_level'] == 'Medium':
-            # Reorder to reach optimal level
-            optimal_stock = risk_info['daily_demand'] * risk_info['lead_time'] * 2
-            reorder_qty = max(0, int(optimal_stock - inv['current_stock']))
-            
-            if reorder_qty == 0:
-                reorder_qty = int((inv['max_capacity'] - inv['current_stock']) * 0.5)
-            
-            action = f'Reorder {reorder_qty} units' if reorder_qty > 0 else 'No Action'
-            reason = f"Moderate risk: {risk_info['days_of_stock']} days of stock with {risk_info['lead_time']} day lead time. Risk factor {risk_info['risk_factor']} suggests proactive restocking of {reorder_qty} units."
-        else:
-            reason = f"Low risk: {risk_info['days_of_stock']} days of stock available, well above {risk_info['lead_time']} day lead time. Risk factor {risk_info['risk_factor']} is acceptable."
+        touched = self.inventory.iloc[rows]
+        price = touched['unit_cost'].to_numpy() if 'unit_cost' in self.inventory.columns else DEFAULT_UNIT_PRICE
+        categories = touched['category'] if 'category' in self.inventory.columns else pd.Series('All Products', index=touched.index)
+        for category, value in pd.Series(deltas * price, index=touched.index).groupby(categories).sum().items():
+            self.rollups.add_stock_value(category, value)
+        self._shift_risk_counts(previous, scores['risk_code'])
         
-        decision = {
-            'product_id': product_id,
-            'product_name': inv['product_name'],
-            'timestamp': datetime.now().isoformat(),
-            'observed_stock': int(risk_info['current_stock']),
-            'daily_demand': float(risk_info['daily_demand']),
-            'days_of_stock': risk_info['days_of_stock'],
-            'lead_time_days': int(risk_info['lead_time']),
-            'risk_factor': risk_info['risk_factor'],
-            'risk_level': risk_info['risk_level'],
-            'action': action,
-            'reorder_qty': reorder_qty,
-            'reason': reason
-        }
+        levels = np.array(RISK_LEVELS)
+        return pd.DataFrame({
+            'product_id': touched['product_id'].to_numpy(),
+            'current_stock': stock,
+            'previous_risk_level': levels[previous],
+            'risk_level': levels[scores['risk_code']],
+            'risk_factor': scores['risk_factor'],
+            'days_of_stock': scores['days_of_stock']
+        })
+    
+    def plan_reorders(self, budget=None, space_limits=None, space_column='category', cost_column='unit_cost'):
+        # Global allocation stage: share a total budget and per-group space limits
+        # (e.g. per category or warehouse) across all products, highest risk first.
+        scores = self.score_all()
+        requested = np.where(scores['risk_code'] < 2, scores['reorder_qty'], 0)
+        constraints = []
         
-        self.decisions.append(decision)
-        self._save_decisions()
+        if budget is not None:
+            if cost_column not in self.inventory.columns:
+                raise ValueError(f"Budget allocation needs a '{cost_column}' column in the inventory data")
+            unit_cost = self.inventory[cost_column].to_numpy(dtype=float)
+            # A missing or negative cost would poison the running spend of every product after it
+            invalid = (requested > 0) & ~(unit_cost >= 0)
+            if invalid.any():
+                products = ', '.join(map(str, self.inventory['product_id'].to_numpy()[invalid][:5]))
+                raise ValueError(f"Budget allocation needs a non-negative '{cost_column}' for every product to reorder "
+                                 f"({invalid.sum()} invalid, e.g. {products})")
+            # Products not reordering spend nothing, whatever their listed cost
+            unit_cost = np.where(requested > 0, unit_cost, 0.0)
+            constraints.append((np.zeros(len(requested), dtype=np.int64), unit_cost, [budget]))
+        
+        if space_limits:
+            if space_column not in self.inventory.columns:
+                raise ValueError(f"Space allocation needs a '{space_column}' column in the inventory data")
+            groups = list(space_limits)
+            # Products in a group without a limit are left unconstrained (-1)
+            group_codes = pd.Index(groups).get_indexer(self.inventory[space_column])
+            constraints.append((group_codes, np.ones(len(requested)), [space_limits[g] for g in groups]))
+        
+        allocated = allocate_reorders(requested, scores['risk_factor'], constraints)
+        return pd.DataFrame({
+            'product_id': self.inventory['product_id'].to_numpy(),
+            'risk_factor': scores['risk_factor'],
+            'requested_qty': requested,
+            'allocated_qty': allocated
+        })
+    
+    def make_decision(self, product_id, save=True, reorder_qty=None):
+        # reorder_qty, when given, is this product's share from plan_reorders and
+        # caps the quantity sized by score_risk
+        allocated_qty = reorder_qty
+        rows = self._product_rows(product_id)
+        risk_info = self.calculate_risk(product_id)
+        inv = self.inventory.iloc[rows[0]]
+        reorder_qty = risk_info['reorder_qty']
+        
+        reason_id = REASON_IDS[risk_info['risk_level']]
+        if allocated_qty is not None and reorder_qty > allocated_qty:
+            reorder_qty = int(allocated_qty)
+            reason_id = ALLOCATED_REASON_IDS[risk_info['risk_level']]
+        
+        record = DecisionRecord(
+            product_ref=self._intern_product(product_id, inv['product_name']),
+            timestamp=datetime.now().timestamp(),
+            observed_stock=int(risk_info['current_stock']),
+            daily_demand=float(risk_info['daily_demand']),
+            days_of_stock=_plain(risk_info['days_of_stock']),
+            lead_time_days=int(risk_info['lead_time']),
+            risk_factor=_plain(risk_info['risk_factor']),
+            reorder_qty=_plain(reorder_qty),
+            reason_id=reason_id
+        )
+        
+        self._append_decision(record)
         
         # Update inventory if reordering
         if reorder_qty > 0:
-            self.inventory.loc[self.inventory['product_id'] == product_id, 'current_stock'] += reorder_qty
+            previous = self.score_all(rows)['risk_code']
+            column = self.inventory.columns.get_loc('current_stock')
+            self.inventory.iloc[rows, column] = self.inventory['current_stock'].to_numpy()[rows] + reorder_qty
+            self.rollups.add_stock_value(self._stock_category(inv), reorder_qty * self._unit_price(inv))
+            self._shift_risk_counts(previous, self.score_all(rows)['risk_code'])
         
-        return decision
+        if save:
+            self.save_decisions()
+        
+        return self.render_decision(record)
     
-    def run_all_products(self):
+    def run_all_products(self, budget=None, space_limits=None, space_column='category', cost_column='unit_cost'):
+        allocation = {}
+        if budget is not None or space_limits:
+            plan = self.plan_reorders(budget, space_limits, space_column, cost_column)
+            allocation = dict(zip(plan['product_id'], plan['allocated_qty'].tolist()))
+        
         results = []
         for product_id in self.inventory['product_id']:
-            decision = self.make_decision(product_id)
+            decision = self.make_decision(product_id, save=False, reorder_qty=allocation.get(product_id))
             results.append(decision)
+        self.save_decisions()
         return results
     
+    def run_all_locations(self, network, include_low=False):
+        # Vectorized counterpart of run_all_products for a LocationInventory:
+        # one scoring pass over the product x store matrix, one rollup update per
+        # risk level and one log write. Returns the logged decisions as a DataFrame.
+        scores = network.score(self.policy)
+        actionable = network.stocked if include_low else network.stocked & (scores['risk_code'] < 2)
+        rows, cols = np.nonzero(actionable)
+        # A healthy network has nothing to log; no empty batch is written
+        if not len(rows):
+            return self._location_frame(self._empty_location_columns(), [])
+        
+        refs = np.array([self._intern_product(pid, name) for pid, name in zip(network.product_ids, network.product_names)], dtype=np.int64)
+        batch = {
+            'timestamp': datetime.now().timestamp(),
+            'product_ref': refs[rows],
+            'location': network.store_ids[cols],
+            'observed_stock': network.current_stock[rows, cols].astype(np.int64),
+            'daily_demand': network.daily_demand[rows, cols].astype(float),
+            'days_of_stock': scores['days_of_stock'][rows, cols],
+            'lead_time_days': network.lead_time_days[rows, cols].astype(np.int64),
+            'risk_factor': scores['risk_factor'][rows, cols],
+            'reorder_qty': scores['reorder_qty'][rows, cols],
+            'reason_id': scores['risk_code'][rows, cols].astype(np.int64)
+        }
+        self._add_location_batch(batch)
+        self._rollup_location_batch(batch)
+        self.save_decisions()
+        
+        # Update inventory if reordering
+        network.current_stock += np.where(network.stocked, scores['reorder_qty'], 0).astype(network.current_stock.dtype)
+        return self._location_frame(batch, datetime.fromtimestamp(batch['timestamp']).isoformat())
+    
+    def _location_frame(self, columns, timestamps):
+        product_ids = np.array([product_id for product_id, _ in self._products], dtype=object)
+        product_names = np.array([product_name for _, product_name in self._products], dtype=object)
+        refs = columns['product_ref']
+        return pd.DataFrame({
+            'product_id': product_ids[refs],
+            'product_name': product_names[refs],
+            'store_id': columns['location'],
+            'timestamp': timestamps,
+            'observed_stock': columns['observed_stock'],
+            'daily_demand': columns['daily_demand'],
+            'days_of_stock': columns['days_of_stock'],
+            'lead_time_days': columns['lead_time_days'],
+            'risk_factor': columns['risk_factor'],
+            'risk_level': np.array(RISK_LEVELS)[columns['reason_id']],
+            'reorder_qty': columns['reorder_qty']
+        })
+    
+    def get_location_decisions(self, product_id=None, store_id=None):
+        # Multi-location decisions as one frame, optionally for one product and/or store
+        ref = self._product_refs.get(product_id) if product_id is not None else None
+        if product_id is not None and ref is None:
+            batches = []
+        else:
+            batches = self.location_decisions
+        
+        parts = []
+        for batch in batches:
+            keep = np.ones(len(batch['product_ref']), dtype=bool)
+            if ref is not None:
+                keep &= batch['product_ref'] == ref
+            if store_id is not None:
+                keep &= batch['location'] == store_id
+            parts.append(({name: batch[name][keep] for name in LOCATION_DECISION_COLUMNS},
+                          np.full(keep.sum(), datetime.fromtimestamp(batch['timestamp']).isoformat(), dtype=object)))
+        
+        if not parts:
+            return self._location_frame(self._empty_location_columns(), [])
+        columns = {name: np.concatenate([part[name] for part, _ in parts]) for name in LOCATION_DECISION_COLUMNS}
+        return self._location_frame(columns, np.concatenate([stamps for _, stamps in parts]))
+    
+    def _empty_location_columns(self):
+        return {name: np.array([], dtype=dtype) for name, dtype in LOCATION_DECISION_DTYPES.items()}
+    
     def get_product_timeline(self, product_id):
-        return [d for d in self.decisions if d['product_id'] == product_id]
+        # Flat decisions only; per-store decisions are in get_location_decisions
+        return [self.render_decision(d) for d in self.decisions if self._decision_product_id(d) == product_id]
     
     def get_current_status(self):
-        status = []
-        for _, inv in self.inventory.iterrows():
-            risk_info = self.calculate_risk(inv['product_id'])
-            recent_decisions = [d for d in self.decisions if d['product_id'] == inv['product_id']]
-            last_action = recent_decisions[-1]['action'] if recent_decisions else 'No Action'
-            
-            status.append({
-                'product_id': inv['product_id'],
-                'product_name': inv['product_name'],
-                'current_stock': int(inv['current_stock']),
-                'daily_demand': risk_info['daily_demand'],
-                'risk_level': risk_info['risk_level'],
-                'risk_factor': risk_info['risk_factor'],
-                'days_of_stock': risk_info['days_of_stock'],
-                'last_action': last_action
-            })
-        return pd.DataFrame(status)
+        scores = self.score_all()
+        last_actions = []
+        for product_id in self.inventory['product_id'].tolist():
+            last_decision = self._last_decision.get(product_id)
+            last_actions.append(self.get_decision_action(last_decision) if last_decision else 'No Action')
+        
+        return pd.DataFrame({
+            'product_id': self.inventory['product_id'].to_numpy(),
+            'product_name': self.inventory['product_name'].to_numpy(),
+            'current_stock': self.inventory['current_stock'].to_numpy(dtype=np.int64),
+            'daily_demand': scores['daily_demand'],
+            'risk_level': np.array(RISK_LEVELS)[scores['risk_code']],
+            'risk_factor': scores['risk_factor'],
+            'days_of_stock': scores['days_of_stock'],
+            'last_action': last_actions
+        })
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+def _group_prefix(values, order_in_group, group_starts):
+    # Exclusive running total of `values` within each group, following priority order
+    sorted_values = values[order_in_group]
+    running = np.cumsum(sorted_values) - sorted_values
+    running -= running[group_starts]
+    prefix = np.empty_like(running)
+    prefix[order_in_group] = running
+    return prefix
+
+
+class _Constraint:
+    # A shared limit: sum(units * weight) within each group must stay <= limit.
+    # Items with group -1 are not bound by it.
+    def __init__(self, groups, weights, limits, order):
+        groups = np.asarray(groups, dtype=np.int64)
+        self.bound = groups >= 0
+        self.groups = np.where(self.bound, groups, 0)
+        self.weights = np.where(self.bound, np.asarray(weights, dtype=float), 0.0)
+        self.remaining = np.asarray(limits, dtype=float).copy()
+
+        # Priority order within each group, plus where each group's run starts
+        self.order_in_group = order[np.argsort(self.groups[order], kind='stable')]
+        sorted_groups = self.groups[self.order_in_group]
+        first = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+        starts = np.flatnonzero(first)
+        self.group_starts = np.repeat(starts, np.diff(np.r_[starts, len(sorted_groups)]))
+
+    def room(self, pending):
+        prefix = _group_prefix(pending * self.weights, self.order_in_group, self.group_starts)
+        room = np.maximum(0, self.remaining[self.groups] - prefix)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            units = np.where(self.weights > 0, np.floor(room / self.weights), np.inf)
+        return np.where(self.bound, units, np.inf)
+
+    def consume(self, units):
+        self.remaining -= np.bincount(self.groups, weights=units * self.weights, minlength=len(self.remaining))
+
+    def exhausted(self):
+        # Items whose group can't take even one more unit
+        return self.bound & (self.weights > 0) & (self.remaining[self.groups] < self.weights - 1e-9)
+
+
+def allocate_reorders(requested, priority, constraints, max_rounds=100):
+    # Greedy allocation of integer reorder units by descending priority under
+    # shared limits. `constraints` is a list of (groups, weights, limits) tuples.
+    #
+    # Each round is one vectorized pass: every item gets at most what is left in
+    # each of its groups after all higher-priority pending requests, so a round
+    # never over-commits. Capacity reserved by items another constraint held back
+    # is released in the next round; items in an exhausted group drop out.
+    requested = np.maximum(0, np.asarray(requested, dtype=np.int64))
+    order = np.argsort(-np.asarray(priority, dtype=float), kind='stable')
+    constraints = [_Constraint(groups, weights, limits, order) for groups, weights, limits in constraints]
+
+    allocated = np.zeros_like(requested)
+    pending = requested.astype(float)
+    for _ in range(max_rounds):
+        if not pending.any():
+            break
+
+        units = pending
+        for constraint in constraints:
+            units = np.minimum(units, constraint.room(pending))
+        units = units.astype(np.int64)
+
+        allocated += units
+        pending = pending - units
+        for constraint in constraints:
+            constraint.consume(units)
+        dropped = np.zeros(len(pending), dtype=bool)
+        for constraint in constraints:
+            dropped |= constraint.exhausted() & (pending > 0)
+        pending[dropped] = 0
+
+        if not units.any() and not dropped.any():
+            break
+
+    return allocated
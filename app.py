@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
 from agent import InventoryAgent
+from events import FileEventSource, EventConsumer
+from scenarios import scenario_grid, run_scenarios
+from datafiles import COLUMNAR_EXTENSIONS, read_table
+import os
 import time
 import altair as alt
 
@@ -197,8 +201,27 @@ st.markdown("""
 def load_agent(_inventory_file=None, _demand_file=None):
     if _inventory_file and _demand_file:
         return InventoryAgent(_inventory_file, _demand_file)
+    # Prefer the memory-mapped Arrow copies written by prepare_data.py when present
+    if os.path.exists('inventory.arrow') and os.path.exists('demand.arrow'):
+        return InventoryAgent('inventory.arrow', 'demand.arrow')
     return InventoryAgent('inventory.csv.gz', 'demand.csv')
 
+def save_upload(uploaded_file, name):
+    # Keep the uploaded format (CSV, Parquet or Arrow) so it loads the same way as local files
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    path = f'/tmp/{name}{extension}'
+    with open(path, 'wb') as f:
+        f.write(uploaded_file.getbuffer())
+    return path
+
+# Stock movements (sales, receipts, adjustments) appended here are applied on each rerun
+EVENTS_FILE = 'events.jsonl'
+UPLOAD_TYPES = ['csv', 'gz'] + [extension.lstrip('.') for extension in COLUMNAR_EXTENSIONS]
+
+@st.cache_resource
+def load_event_consumer(inventory_key, _agent):
+    return EventConsumer(_agent, FileEventSource(EVENTS_FILE), checkpoint_file='events_checkpoint.json')
+
 # Check if custom data is uploaded
 if 'inventory_data' not in st.session_state:
     st.session_state.inventory_data = None
@@ -214,7 +237,7 @@ with col2:
     with subcol1:
         action = st.radio(
             "",
-            ["📊 Overview", "📦 Inventory", "🔍 Product Details", "🤖 Run Agent", "📤 Upload Data"],
+            ["📊 Overview", "📦 Inventory", "🔍 Product Details", "🤖 Run Agent", "🧪 Scenarios", "📤 Upload Data"],
             horizontal=True,
             label_visibility="collapsed"
         )
@@ -228,9 +251,13 @@ if st.session_state.inventory_data is not None and st.session_state.demand_data
 else:
     agent = load_agent()
 
+if os.path.exists(EVENTS_FILE):
+    # Bounded work per rerun; anything left is picked up on the next one
+    load_event_consumer(agent.inventory_file, agent).run(max_batches=20)
+
 if action == "📤 Upload Data":
     st.title("📤 Upload Custom Data")
-    st.markdown("Upload your warehouse inventory and demand data to use the AI agent")
+    st.markdown("Upload your warehouse inventory and demand data to use the AI agent (CSV, Parquet or Arrow/Feather)")
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Upload section in single row
@@ -239,11 +266,12 @@ if action == "📤 Upload Data":
     with col1:
         st.markdown("### 📦 Inventory Data")
         st.markdown("**Required:** `product_id`, `product_name`, `current_stock`, `max_capacity`, `lead_time_days`")
-        inventory_file = st.file_uploader("", type=['csv'], key='inv_upload', label_visibility="collapsed")
+        inventory_file = st.file_uploader("", type=UPLOAD_TYPES, key='inv_upload', label_visibility="collapsed")
         
         if inventory_file:
             try:
-                inv_df = pd.read_csv(inventory_file)
+                inventory_path = save_upload(inventory_file, 'uploaded_inventory')
+                inv_df = read_table(inventory_path)
                 required_cols = ['product_id', 'product_name', 'current_stock', 'max_capacity', 'lead_time_days']
                 
                 if all(col in inv_df.columns for col in required_cols):
@@ -251,8 +279,7 @@ if action == "📤 Upload Data":
                     with st.expander("Preview Data"):
                         st.dataframe(inv_df.head(3), use_container_width=True)
                     
-                    inv_df.to_csv('/tmp/uploaded_inventory.csv', index=False)
-                    st.session_state.inventory_data = '/tmp/uploaded_inventory.csv'
+                    st.session_state.inventory_data = inventory_path
                 else:
                     st.error(f"❌ Missing columns")
             except Exception as e:
@@ -261,11 +288,12 @@ if action == "📤 Upload Data":
     with col2:
         st.markdown("### 📊 Demand Data")
         st.markdown("**Required:** `product_id`, `daily_demand`")
-        demand_file = st.file_uploader("", type=['csv'], key='dem_upload', label_visibility="collapsed")
+        demand_file = st.file_uploader("", type=UPLOAD_TYPES, key='dem_upload', label_visibility="collapsed")
         
         if demand_file:
             try:
-                dem_df = pd.read_csv(demand_file)
+                demand_path = save_upload(demand_file, 'uploaded_demand')
+                dem_df = read_table(demand_path)
                 required_cols = ['product_id', 'daily_demand']
                 
                 if all(col in dem_df.columns for col in required_cols):
@@ -273,8 +301,7 @@ if action == "📤 Upload Data":
                     with st.expander("Preview Data"):
                         st.dataframe(dem_df.head(3), use_container_width=True)
                     
-                    dem_df.to_csv('/tmp/uploaded_demand.csv', index=False)
-                    st.session_state.demand_data = '/tmp/uploaded_demand.csv'
+                    st.session_state.demand_data = demand_path
                 else:
                     st.error(f"❌ Missing columns")
             except Exception as e:
@@ -339,26 +366,29 @@ elif action == "📊 Overview":
     st.markdown("Real-time insights into your inventory performance")
     st.markdown("<br>", unsafe_allow_html=True)
     
-    # Load data
+    # Load data; the status table is one vectorized scoring pass
     status_df = agent.get_current_status()
     inventory = agent.inventory
     
-    # Calculate metrics
-    total_stock_value = (inventory['current_stock'] * 50).sum()
+    # Metrics, counts and deltas come from the pre-aggregated rollups
+    rollups = agent.rollups
+    total_stock_value = rollups.total_stock_value()
+    value_change = rollups.stock_value_change()
+    risk_deltas = rollups.risk_count_deltas()
     total_products = len(inventory)
-    out_of_stock_count = len(status_df[status_df['risk_level'] == 'High'])
-    low_stock = len(status_df[status_df['risk_level'] == 'Medium'])
+    out_of_stock_count = rollups.risk_counts['High']
+    low_stock = rollups.risk_counts['Medium']
     
     # Metric Cards
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("💰 Total Value", f"₹{total_stock_value:,.0f}", delta="-20%")
+        st.metric("💰 Total Value", f"₹{total_stock_value:,.0f}", delta=f"{value_change:+.1f}%" if value_change is not None else None)
     with col2:
-        st.metric("📦 Total Products", f"{total_products}", delta="+5")
+        st.metric("📦 Total Products", f"{total_products}")
     with col3:
-        st.metric("🚨 Critical Stock", out_of_stock_count, delta=f"-{out_of_stock_count}")
+        st.metric("🚨 Critical Stock", out_of_stock_count, delta=risk_deltas['High'], delta_color="inverse")
     with col4:
-        st.metric("⚠️ Low Stock", low_stock, delta=f"-{low_stock}")
+        st.metric("⚠️ Low Stock", low_stock, delta=risk_deltas['Medium'], delta_color="inverse")
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -367,19 +397,36 @@ elif action == "📊 Overview":
     
     with col1:
         st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.subheader("📈 Weekly Sales Trend")
-        sales_data = pd.DataFrame({
-            'Day': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
-            'Sales': [120, 190, 150, 180, 160, 200, 170]
-        })
+        st.subheader("📈 Reorder Trend")
+        daily_tab, weekly_tab, value_tab = st.tabs(["Last 7 Days", "Last 8 Weeks", "Stock Value"])
         
-        # Create altair chart with proper ordering
-        chart = alt.Chart(sales_data).mark_bar(color='#1e88e5').encode(
-            x=alt.X('Day:N', sort=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'], axis=alt.Axis(labelAngle=0)),
-            y=alt.Y('Sales:Q', title='Sales')
-        ).properties(height=350)
+        with daily_tab:
+            daily_data = pd.DataFrame(rollups.daily_trend(days=7))
+            chart = alt.Chart(daily_data).mark_bar(color='#1e88e5').encode(
+                x=alt.X('day:N', sort=daily_data['day'].tolist(), title='Day', axis=alt.Axis(labelAngle=0)),
+                y=alt.Y('units:Q', title='Units Reordered'),
+                tooltip=['date', 'units', 'reorders']
+            ).properties(height=320)
+            st.altair_chart(chart, use_container_width=True)
+        
+        with weekly_tab:
+            weekly_data = pd.DataFrame(rollups.weekly_trend(weeks=8))
+            chart = alt.Chart(weekly_data).mark_bar(color='#764ba2').encode(
+                x=alt.X('week:N', sort=weekly_data['week'].tolist(), title='Week', axis=alt.Axis(labelAngle=0)),
+                y=alt.Y('units:Q', title='Units Reordered'),
+                tooltip=['week', 'units', 'reorders']
+            ).properties(height=320)
+            st.altair_chart(chart, use_container_width=True)
+        
+        with value_tab:
+            value_data = pd.DataFrame(list(rollups.stock_value.items()), columns=['Category', 'Value'])
+            chart = alt.Chart(value_data).mark_bar(color='#48bb78').encode(
+                x=alt.X('Category:N', axis=alt.Axis(labelAngle=0)),
+                y=alt.Y('Value:Q', title='Stock Value (₹)'),
+                tooltip=['Category', alt.Tooltip('Value:Q', format=',.0f')]
+            ).properties(height=320)
+            st.altair_chart(chart, use_container_width=True)
         
-        st.altair_chart(chart, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
@@ -496,22 +543,103 @@ elif action == "🔍 Product Details":
         else:
             st.info("No decisions recorded yet. Run the agent first.")
 
+elif action == "🧪 Scenarios":
+    st.title("🧪 What-If Scenarios")
+    st.markdown("Compare risk policies and demand or lead-time shocks across the whole catalog. Live inventory and the decision log are not changed.")
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    st.markdown("Enter one or more comma-separated values per parameter; every combination is scored.")
+    policy = agent.policy
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        high_threshold = st.text_input("High risk cut-off", f"{policy.high_threshold}")
+        medium_threshold = st.text_input("Medium risk cut-off", f"{policy.medium_threshold}")
+    with col2:
+        high_cover = st.text_input("High cover (× lead-time demand)", f"{policy.high_cover}")
+        medium_cover = st.text_input("Medium cover (× lead-time demand)", f"{policy.medium_cover}")
+    with col3:
+        high_fill = st.text_input("High capacity fill", f"{policy.high_fill}")
+        medium_fill = st.text_input("Medium capacity fill", f"{policy.medium_fill}")
+    with col4:
+        demand_shock = st.text_input("Demand shock (×)", "0.8, 1.0, 1.2")
+        lead_time_shock = st.text_input("Lead time shock (×)", "1.0, 1.5")
+    
+    try:
+        parsed = {
+            name: [float(v) for v in text.split(',') if v.strip()]
+            for name, text in [
+                ('high_threshold', high_threshold), ('medium_threshold', medium_threshold),
+                ('high_cover', high_cover), ('medium_cover', medium_cover),
+                ('high_fill', high_fill), ('medium_fill', medium_fill),
+                ('demand_shock', demand_shock), ('lead_time_shock', lead_time_shock)
+            ]
+        }
+        scenarios = scenario_grid(**parsed)
+    except ValueError as e:
+        st.error(f"❌ Error: {str(e)}")
+        scenarios = None
+    
+    if scenarios is not None:
+        results = run_scenarios(agent, scenarios)
+        st.success(f"✅ Scored {len(agent.inventory)} products under {len(results)} scenarios")
+        
+        chart = alt.Chart(results).mark_circle(size=80).encode(
+            x=alt.X('reorder_units:Q', title='Total Reorder Units'),
+            y=alt.Y('high_risk:Q', title='High Risk Products'),
+            color=alt.Color('demand_shock:N', title='Demand Shock'),
+            tooltip=list(results.columns)
+        ).properties(height=350)
+        st.altair_chart(chart, use_container_width=True)
+        
+        st.dataframe(results, use_container_width=True, hide_index=True, height=400)
+
 elif action == "🤖 Run Agent":
     st.title("🤖 AI Agent Execution")
     st.markdown("Let the AI agent analyze inventory and make autonomous decisions")
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Optional shared limits, applied across the whole catalog before reordering
+    budget = None
+    space_limits = {}
+    has_cost = 'unit_cost' in agent.inventory.columns
+    has_category = 'category' in agent.inventory.columns
+    if has_cost or has_category:
+        with st.expander("⚖️ Reorder Constraints"):
+            if has_cost:
+                budget_input = st.number_input("Total reorder budget (₹, 0 = unlimited)", min_value=0.0, value=0.0, step=1000.0)
+                budget = budget_input if budget_input > 0 else None
+            if has_category:
+                st.markdown("**Space limit per category** (units, 0 = unlimited)")
+                categories = sorted(agent.inventory['category'].dropna().unique())
+                limit_cols = st.columns(min(len(categories), 4) or 1)
+                for i, category in enumerate(categories):
+                    with limit_cols[i % len(limit_cols)]:
+                        limit = st.number_input(category, min_value=0, value=0, step=100, key=f'space_{category}')
+                        if limit > 0:
+                            space_limits[category] = limit
+    
     if st.button("▶️ Execute Agent Analysis", type="primary"):
         with st.spinner("🔄 Agent analyzing inventory..."):
             progress_bar = st.progress(0)
             results = []
             
+            allocation = {}
+            if budget is not None or space_limits:
+                try:
+                    plan = agent.plan_reorders(budget=budget, space_limits=space_limits)
+                except ValueError as e:
+                    st.error(f"❌ Error: {str(e)}")
+                    st.stop()
+                allocation = dict(zip(plan['product_id'], plan['allocated_qty'].tolist()))
+            
             products = agent.inventory['product_id'].tolist()
             for i, product_id in enumerate(products):
-                decision = agent.make_decision(product_id)
+                decision = agent.make_decision(product_id, save=False, reorder_qty=allocation.get(product_id))
                 results.append(decision)
                 progress_bar.progress((i + 1) / len(products))
                 time.sleep(0.01)
+            # Write the log once for the whole run
+            agent.save_decisions()
             
             st.success(f"✅ Agent completed analysis of {len(results)} products")
             
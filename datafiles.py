@@ -0,0 +1,112 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+# Columns the risk engine reads; anything else in a file is never loaded
+INVENTORY_COLUMNS = ['product_id', 'store_id', 'product_name', 'current_stock', 'max_capacity',
+                     'lead_time_days', 'category', 'unit_cost']
+DEMAND_COLUMNS = ['product_id', 'store_id', 'daily_demand']
+
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+COLUMNAR_EXTENSIONS = ARROW_EXTENSIONS + PARQUET_EXTENSIONS
+
+
+def _require_pyarrow(path):
+    if pa is None:
+        raise ImportError(f"Reading or writing '{path}' needs pyarrow (pip install pyarrow)")
+
+
+def read_table(path, columns=None):
+    # Load a CSV (optionally .gz), Parquet or Arrow IPC/Feather file, keeping only
+    # `columns` that exist in it. Arrow files are memory-mapped, so only the pages
+    # of the projected columns are read and numeric columns are not copied.
+    path = str(path)
+    wanted = None if columns is None else set(columns)
+
+    if path.endswith(ARROW_EXTENSIONS):
+        _require_pyarrow(path)
+        # The mapping stays alive as long as the returned frame references it
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        if wanted is not None:
+            table = table.select([name for name in table.schema.names if name in wanted])
+        return table.to_pandas(split_blocks=True)
+
+    if path.endswith(PARQUET_EXTENSIONS):
+        _require_pyarrow(path)
+        if wanted is not None:
+            names = pa.parquet.read_schema(path).names
+            return pd.read_parquet(path, columns=[name for name in names if name in wanted])
+        return pd.read_parquet(path)
+
+    # Compression is inferred from the extension, so .csv.gz works as well
+    return pd.read_csv(path, usecols=(lambda name: name in wanted) if wanted is not None else None)
+
+
+def _id_kind(arrow_type):
+    # Ids only match within a kind; 1 never matches '1', as with a pandas lookup
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return 'string'
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        return 'number'
+    return str(arrow_type)
+
+
+def first_rows(keys, values):
+    # Row of the first occurrence of each key in `values` (-1 where missing).
+    # With pyarrow the ids are matched by index_in, so Arrow-backed string
+    # columns are never hashed into Python objects.
+    if pa is None:
+        index = pd.Index(values)
+        if index.is_unique:
+            return index.get_indexer(keys)
+        first = np.flatnonzero(~index.duplicated())
+        positions = pd.Index(values.iloc[first]).get_indexer(keys)
+        return np.append(first, -1)[positions]
+
+    keys = pa.chunked_array(pa.array(keys))
+    values = pa.chunked_array(pa.array(values)).combine_chunks()
+    if _id_kind(keys.type) != _id_kind(values.type):
+        return np.full(len(keys), -1)
+    if keys.type != values.type:
+        common = pa.float64() if _id_kind(keys.type) == 'number' else pa.large_string()
+        keys, values = keys.cast(common), values.cast(common)
+    return pc.index_in(keys, value_set=values).fill_null(-1).to_numpy()
+
+
+def write_table(df, path):
+    path = str(path)
+    if path.endswith(ARROW_EXTENSIONS):
+        _require_pyarrow(path)
+        # Uncompressed so readers can memory-map it without decoding
+        feather.write_feather(df, path, compression='uncompressed')
+    elif path.endswith(PARQUET_EXTENSIONS):
+        _require_pyarrow(path)
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def convert(source, destination):
+    write_table(read_table(source), destination)
+
+
+if __name__ == '__main__':
+    # python datafiles.py inventory.csv.gz inventory.arrow [demand.csv demand.arrow ...]
+    args = sys.argv[1:]
+    if not args or len(args) % 2:
+        print("Usage: python datafiles.py SOURCE DESTINATION [SOURCE DESTINATION ...]")
+        sys.exit(1)
+    for source, destination in zip(args[::2], args[1::2]):
+        convert(source, destination)
+        print(f"✓ Converted {source} -> {destination} ({os.path.getsize(destination):,} bytes)")
@@ -0,0 +1,224 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import selectors
+import socket
+
+# Sign applied to each event's qty; adjustments carry their own sign
+EVENT_SIGNS = {'sale': -1, 'receipt': 1, 'adjustment': 1}
+
+
+class FileEventSource:
+    # Tails a local append-only JSON-lines file:
+    #   {"type": "sale", "product_id": "P0001", "qty": 3}
+    # Positions are byte offsets, so a restart resumes exactly after the last
+    # fully consumed line. A trailing line without its newline is left for later.
+    def __init__(self, path, read_bytes=1 << 20):
+        self.path = path
+        self.read_bytes = read_bytes
+        self.position = 0
+
+    def seek(self, position):
+        self.position = position
+
+    def read(self, max_events):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            # A file shorter than our offset was truncated or replaced; start over
+            if os.fstat(f.fileno()).st_size < self.position:
+                self.position = 0
+            f.seek(self.position)
+            data = f.read(self.read_bytes)
+
+        lines = data.split(b'\n')[:-1][:max_events]
+        self.position += sum(len(line) + 1 for line in lines)
+        return lines
+
+
+class SocketEventSource:
+    # Accepts producers on a local TCP port; each sends newline-delimited JSON
+    # events. Only max_buffer_bytes are buffered per connection: once full we
+    # stop reading, and TCP flow control pushes back on the producer. Positions
+    # count consumed events; a socket can't be replayed, so after a restart
+    # producers resume with whatever they send next.
+    def __init__(self, host='127.0.0.1', port=9099, max_buffer_bytes=1 << 20):
+        self.max_buffer_bytes = max_buffer_bytes
+        self.position = 0
+        self.selector = selectors.DefaultSelector()
+        self.server = socket.create_server((host, port))
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ)
+        self.buffers = {}
+
+    def seek(self, position):
+        self.position = position
+
+    def _pump(self):
+        for key, _ in self.selector.select(timeout=0):
+            if key.fileobj is self.server:
+                conn, _ = self.server.accept()
+                conn.setblocking(False)
+                self.selector.register(conn, selectors.EVENT_READ)
+                self.buffers[conn] = b''
+                continue
+
+            conn = key.fileobj
+            if len(self.buffers[conn]) >= self.max_buffer_bytes:
+                continue
+            try:
+                chunk = conn.recv(self.max_buffer_bytes - len(self.buffers[conn]))
+            except OSError:
+                # A reset producer is dropped; its complete lines are still delivered
+                self.selector.unregister(conn)
+                conn.close()
+                buffer = self.buffers[conn]
+                self.buffers[conn] = buffer[:buffer.rfind(b'\n') + 1]
+                continue
+            if chunk:
+                self.buffers[conn] += chunk
+            elif not self.buffers[conn]:
+                self.selector.unregister(conn)
+                conn.close()
+                del self.buffers[conn]
+
+    def read(self, max_events):
+        self._pump()
+        lines = []
+        for conn, buffer in self.buffers.items():
+            if len(lines) >= max_events:
+                break
+            complete = buffer.split(b'\n')
+            taken = complete[:-1][:max_events - len(lines)]
+            lines.extend(taken)
+            self.buffers[conn] = buffer[sum(len(line) + 1 for line in taken):]
+        # Forget connections closed after a reset once they are drained
+        for conn in [conn for conn, buffer in self.buffers.items() if not buffer and conn.fileno() == -1]:
+            del self.buffers[conn]
+        self.position += len(lines)
+        return lines
+
+    def close(self):
+        for conn in list(self.buffers):
+            conn.close()
+        self.selector.close()
+        self.server.close()
+
+
+class EventConsumer:
+    # Applies stock-movement events to an InventoryAgent in micro-batches.
+    #
+    # Each batch is netted per product and applied with one vectorized update,
+    # and only the touched products are re-scored. After every batch the source
+    # position and the net stock movement since the inventory snapshot are
+    # checkpointed, so a restart on the same snapshot resumes where it stopped.
+    def __init__(self, agent, source, checkpoint_file=None, batch_size=10000):
+        self.agent = agent
+        self.source = source
+        self.checkpoint_file = checkpoint_file
+        self.batch_size = batch_size
+        self.events = 0
+        self.rejected = 0
+        self.stock_deltas = {}
+        # Events must carry product ids of the inventory's id type to be applied
+        self.id_type = int if pd.api.types.is_integer_dtype(agent.inventory['product_id']) else str
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return
+        with open(self.checkpoint_file, 'r') as f:
+            checkpoint = json.load(f)
+
+        self.source.seek(checkpoint['position'])
+        self.events = checkpoint['events']
+        self.rejected = checkpoint['rejected']
+        # Movements only replay onto the snapshot they were applied to; a new
+        # inventory file is taken to already include them
+        if checkpoint['inventory_file'] == self.agent.inventory_file:
+            stock_deltas = checkpoint['stock_deltas']
+            # Saved as [product_id, delta] pairs so integer ids keep their type;
+            # older checkpoints used an object, whose keys are always strings
+            if isinstance(stock_deltas, dict):
+                stock_deltas = [(self.id_type(product_id), delta) for product_id, delta in stock_deltas.items()]
+            for product_id, delta in stock_deltas:
+                self.stock_deltas[product_id] = self.stock_deltas.get(product_id, 0) + delta
+            if self.stock_deltas:
+                self.agent.apply_stock_deltas(list(self.stock_deltas), list(self.stock_deltas.values()))
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_file:
+            return
+        checkpoint = {
+            'inventory_file': self.agent.inventory_file,
+            'position': self.source.position,
+            'events': self.events,
+            'rejected': self.rejected,
+            'stock_deltas': list(self.stock_deltas.items())
+        }
+        # Write-then-rename so a crash never leaves a half-written checkpoint
+        tmp_file = self.checkpoint_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps(checkpoint, separators=(',', ':')))
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def _parse(self, lines):
+        product_ids = []
+        quantities = []
+        for line in lines:
+            try:
+                event = json.loads(line)
+                quantity = EVENT_SIGNS[event['type']] * int(event['qty'])
+                product_id = event['product_id']
+            except (ValueError, KeyError, TypeError):
+                self.rejected += 1
+                continue
+            # bool is an int subclass, so check it explicitly
+            if not isinstance(product_id, self.id_type) or isinstance(product_id, bool):
+                self.rejected += 1
+                continue
+            product_ids.append(product_id)
+            quantities.append(quantity)
+        return product_ids, quantities
+
+    def poll(self):
+        # Consume at most one batch; returns the re-scored products it touched
+        lines = self.source.read(self.batch_size)
+        if not lines:
+            return None
+
+        product_ids, quantities = self._parse(lines)
+        codes, products = pd.factorize(pd.Series(product_ids, dtype=object))
+        products = np.asarray(products, dtype=object)
+        net = np.bincount(codes, weights=quantities, minlength=len(products)).astype(np.int64)
+
+        changes = self.agent.apply_stock_deltas(products, net)
+        # Only products the agent knows about are carried in the checkpoint
+        net_by_product = dict(zip(products.tolist(), net.tolist()))
+        for product_id in changes['product_id'].tolist():
+            self.stock_deltas[product_id] = self.stock_deltas.get(product_id, 0) + net_by_product[product_id]
+
+        self.events += len(lines)
+        self._save_checkpoint()
+        return changes
+
+    def run(self, max_batches=None):
+        # Drain available events; max_batches bounds the work done per call
+        batches = 0
+        changed = []
+        while max_batches is None or batches < max_batches:
+            changes = self.poll()
+            if changes is None:
+                break
+            changed.append(changes)
+            batches += 1
+        if not changed:
+            return None
+
+        # One row per product: latest state, risk level from before the run
+        changes = pd.concat(changed, ignore_index=True)
+        previous = changes.drop_duplicates('product_id', keep='first').set_index('product_id')['previous_risk_level']
+        changes = changes.drop_duplicates('product_id', keep='last').reset_index(drop=True)
+        changes['previous_risk_level'] = previous.reindex(changes['product_id']).to_numpy()
+        return changes
@@ -0,0 +1,109 @@
+import pandas as pd
+import numpy as np
+from agent import DEFAULT_POLICY, RISK_LEVELS, score_risk
+from datafiles import DEMAND_COLUMNS, INVENTORY_COLUMNS, read_table
+
+
+class LocationInventory:
+    # Multi-location inventory: every quantity is a dense product x store array,
+    # so risk and reorder sizing for the whole network is one broadcast.
+    def __init__(self, inventory, demand):
+        product_codes, self.product_ids = pd.factorize(inventory['product_id'])
+        store_codes, self.store_ids = pd.factorize(inventory['store_id'])
+        self.product_ids = np.asarray(self.product_ids)
+        self.store_ids = np.asarray(self.store_ids)
+        shape = (len(self.product_ids), len(self.store_ids))
+
+        if 'product_name' in inventory.columns:
+            names = inventory.groupby('product_id', sort=False)['product_name'].first()
+            self.product_names = names.reindex(self.product_ids).to_numpy()
+        else:
+            self.product_names = self.product_ids.copy()
+
+        # Cells with no inventory row mean the store doesn't carry the product
+        self.stocked = np.zeros(shape, dtype=bool)
+        self.stocked[product_codes, store_codes] = True
+
+        self.current_stock = np.zeros(shape, dtype=np.int64)
+        self.current_stock[product_codes, store_codes] = inventory['current_stock'].to_numpy()
+        self.max_capacity = np.zeros(shape, dtype=np.int64)
+        self.max_capacity[product_codes, store_codes] = inventory['max_capacity'].to_numpy()
+        self.lead_time_days = np.zeros(shape, dtype=np.int32)
+        self.lead_time_days[product_codes, store_codes] = inventory['lead_time_days'].to_numpy()
+
+        demand_products = pd.Index(self.product_ids).get_indexer(demand['product_id'])
+        demand_stores = pd.Index(self.store_ids).get_indexer(demand['store_id'])
+        known = (demand_products >= 0) & (demand_stores >= 0)
+        self.daily_demand = np.zeros(shape, dtype=float)
+        self.daily_demand[demand_products[known], demand_stores[known]] = demand['daily_demand'].to_numpy()[known]
+
+    @classmethod
+    def from_files(cls, inventory_file, demand_file):
+        return cls(read_table(inventory_file, INVENTORY_COLUMNS), read_table(demand_file, DEMAND_COLUMNS))
+
+    def score(self, policy=DEFAULT_POLICY):
+        scores = score_risk(self.current_stock, self.daily_demand, self.lead_time_days, self.max_capacity, policy)
+        # Uncarried cells are never at risk and never reordered
+        scores['risk_code'][~self.stocked] = 2
+        scores['reorder_qty'][~self.stocked] = 0
+        return scores
+
+    def _summary(self, axis, index, name, scores):
+        scores = scores if scores is not None else self.score()
+        stocked = self.stocked
+        total_stock = np.where(stocked, self.current_stock, 0).sum(axis=axis)
+        total_demand = np.where(stocked, self.daily_demand, 0).sum(axis=axis)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_of_stock = np.where(total_demand == 0, 999, total_stock / total_demand)
+
+        summary = pd.DataFrame({
+            name: index,
+            'locations': stocked.sum(axis=axis),
+            'current_stock': total_stock,
+            'daily_demand': total_demand.round(2),
+            'days_of_stock': days_of_stock.round(2),
+            'high_risk': ((scores['risk_code'] == 0) & stocked).sum(axis=axis),
+            'medium_risk': ((scores['risk_code'] == 1) & stocked).sum(axis=axis),
+            'reorder_qty': scores['reorder_qty'].sum(axis=axis)
+        })
+        return summary
+
+    def product_summary(self, scores=None):
+        summary = self._summary(1, self.product_ids, 'product_id', scores)
+        summary.insert(1, 'product_name', self.product_names)
+        return summary
+
+    def store_summary(self, scores=None):
+        return self._summary(0, self.store_ids, 'store_id', scores)
+
+    def network_summary(self, scores=None):
+        scores = scores if scores is not None else self.score()
+        stocked = self.stocked
+        counts = np.bincount(scores['risk_code'][stocked], minlength=len(RISK_LEVELS))
+        summary = {
+            'products': len(self.product_ids),
+            'stores': len(self.store_ids),
+            'locations': int(stocked.sum()),
+            'current_stock': int(self.current_stock[stocked].sum()),
+            'daily_demand': round(float(self.daily_demand[stocked].sum()), 2),
+            'reorder_qty': int(scores['reorder_qty'].sum())
+        }
+        for level, count in zip(RISK_LEVELS, counts):
+            summary[f'{level.lower()}_risk'] = int(count)
+        return summary
+
+    def get_location_status(self, product_id, policy=DEFAULT_POLICY):
+        # Per-store breakdown for one product, in the shape of get_current_status
+        row = pd.Index(self.product_ids).get_loc(product_id)
+        stores = np.nonzero(self.stocked[row])[0]
+        scores = score_risk(self.current_stock[row, stores], self.daily_demand[row, stores],
+                            self.lead_time_days[row, stores], self.max_capacity[row, stores], policy)
+        return pd.DataFrame({
+            'store_id': self.store_ids[stores],
+            'current_stock': self.current_stock[row, stores],
+            'daily_demand': self.daily_demand[row, stores],
+            'risk_level': np.array(RISK_LEVELS)[scores['risk_code']],
+            'risk_factor': scores['risk_factor'],
+            'days_of_stock': scores['days_of_stock'],
+            'reorder_qty': scores['reorder_qty']
+        })
@@ -3,6 +3,7 @@ import numpy as np
 import gzip
 import json
 from datetime import datetime
+from datafiles import pa, write_table
 
 # Load retail data
 df = pd.read_csv('retail_store_inventory.csv')
@@ -18,7 +19,8 @@ demand_data['daily_demand'] = demand_data['daily_demand'].round(2)
 product_info = df.groupby('Product ID').agg({
     'Category': 'first',
     'Inventory Level': 'last',
-    'Units Sold': 'mean'
+    'Units Sold': 'mean',
+    'Price': 'mean'
 }).reset_index()
 
 # Create inventory dataset with simulated parameters
@@ -27,7 +29,9 @@ inventory_data = pd.DataFrame({
     'product_name': product_info['Category'] + '_' + product_info['Product ID'],
     'current_stock': product_info['Inventory Level'],
     'max_capacity': (product_info['Inventory Level'] * np.random.uniform(1.5, 2.5, len(product_info))).astype(int),
-    'lead_time_days': np.random.randint(3, 15, len(product_info))
+    'lead_time_days': np.random.randint(3, 15, len(product_info)),
+    'category': product_info['Category'],
+    'unit_cost': product_info['Price'].round(2)
 })
 
 # Save compressed inventory data
@@ -36,6 +40,42 @@ inventory_data.to_csv('inventory.csv.gz', index=False, compression='gzip')
 # Save demand data
 demand_data.to_csv('demand.csv', index=False)
 
+# Per-store (product x store) data for the multi-location model
+location_demand = df.groupby(['Product ID', 'Store ID']).agg({
+    'Units Sold': 'mean'
+}).reset_index()
+location_demand.columns = ['product_id', 'store_id', 'daily_demand']
+location_demand['daily_demand'] = location_demand['daily_demand'].round(2)
+
+location_info = df.groupby(['Product ID', 'Store ID']).agg({
+    'Category': 'first',
+    'Inventory Level': 'last'
+}).reset_index()
+
+location_inventory = pd.DataFrame({
+    'product_id': location_info['Product ID'],
+    'store_id': location_info['Store ID'],
+    'product_name': location_info['Category'] + '_' + location_info['Product ID'],
+    'current_stock': location_info['Inventory Level'],
+    'max_capacity': (location_info['Inventory Level'] * np.random.uniform(1.5, 2.5, len(location_info))).astype(int),
+    'lead_time_days': np.random.randint(3, 15, len(location_info))
+})
+
+location_inventory.to_csv('inventory_locations.csv.gz', index=False, compression='gzip')
+location_demand.to_csv('demand_locations.csv', index=False)
+
+# Columnar copies load memory-mapped, without parsing (needs pyarrow)
+if pa is not None:
+    write_table(inventory_data, 'inventory.arrow')
+    write_table(demand_data, 'demand.arrow')
+    write_table(location_inventory, 'inventory_locations.arrow')
+    write_table(location_demand, 'demand_locations.arrow')
+
 print(f"✓ Processed {len(inventory_data)} products")
+print(f"✓ Processed {len(location_inventory)} product x store locations")
 print(f"✓ Created inventory.csv.gz")
 print(f"✓ Created demand.csv")
+print(f"✓ Created inventory_locations.csv.gz")
+print(f"✓ Created demand_locations.csv")
+if pa is not None:
+    print(f"✓ Created Arrow copies (inventory.arrow, demand.arrow, inventory_locations.arrow, demand_locations.arrow)")
@@ -0,0 +1,148 @@
+from datetime import datetime, date, timedelta
+import json
+import os
+
+# Placeholder used when the inventory has no unit_cost column
+DEFAULT_UNIT_PRICE = 50
+
+
+def _empty_counts():
+    return {'decisions': 0, 'reorders': 0, 'units': 0, 'High': 0, 'Medium': 0, 'Low': 0}
+
+
+def _week_key(day):
+    year, week, _ = day.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+class DecisionRollups:
+    # Pre-aggregated analytics, updated as decisions are appended so the Overview
+    # page never has to scan the decision log or the inventory.
+    def __init__(self, rollup_file):
+        self.rollup_file = rollup_file
+        self.daily = {}
+        self.weekly = {}
+        self.by_risk = {}
+        self.stock_value = {}
+        self.stock_value_daily = {}
+        # Current product counts per risk level, and the closing High/Medium counts per day
+        self.risk_counts = {}
+        self.risk_counts_daily = {}
+
+    def load(self):
+        if not os.path.exists(self.rollup_file):
+            return False
+        with open(self.rollup_file, 'r') as f:
+            data = json.load(f)
+        self.daily = data['daily']
+        self.weekly = data['weekly']
+        self.by_risk = data['by_risk']
+        self.stock_value = data['stock_value']
+        self.stock_value_daily = data['stock_value_daily']
+        self.risk_counts = data.get('risk_counts', {})
+        self.risk_counts_daily = data.get('risk_counts_daily', {})
+        return True
+
+    def save(self):
+        data = {
+            'daily': self.daily,
+            'weekly': self.weekly,
+            'by_risk': self.by_risk,
+            'stock_value': self.stock_value,
+            'stock_value_daily': self.stock_value_daily,
+            'risk_counts': self.risk_counts,
+            'risk_counts_daily': self.risk_counts_daily
+        }
+        with open(self.rollup_file, 'w') as f:
+            f.write(json.dumps(data, separators=(',', ':')))
+
+    def add_decision(self, timestamp, risk_level, reorder_qty):
+        reordered = reorder_qty > 0
+        self.add_decisions(timestamp, risk_level, 1, int(reordered), reorder_qty if reordered else 0)
+
+    def add_decisions(self, timestamp, risk_level, decisions, reorders, units):
+        # Bulk form of add_decision for a batch logged at one timestamp
+        # timestamp is epoch seconds (compact records) or an ISO string (old format)
+        if isinstance(timestamp, str):
+            day = datetime.fromisoformat(timestamp).date()
+        else:
+            day = datetime.fromtimestamp(timestamp).date()
+
+        for counts in (self.daily.setdefault(day.isoformat(), _empty_counts()),
+                       self.weekly.setdefault(_week_key(day), _empty_counts())):
+            counts['decisions'] += decisions
+            counts['reorders'] += reorders
+            counts['units'] += units
+            counts[risk_level] += decisions
+
+        risk = self.by_risk.setdefault(risk_level, {'decisions': 0, 'reorders': 0, 'units': 0})
+        risk['decisions'] += decisions
+        risk['reorders'] += reorders
+        risk['units'] += units
+
+    def set_stock_value(self, values_by_category, day=None):
+        self.stock_value = {category: float(value) for category, value in values_by_category.items()}
+        self._close_stock_value(day)
+
+    def add_stock_value(self, category, delta, day=None):
+        self.stock_value[category] = self.stock_value.get(category, 0.0) + float(delta)
+        self._close_stock_value(day)
+
+    def _close_stock_value(self, day):
+        day = (day or date.today()).isoformat()
+        # Re-insert so the newest day stays last and the previous day is one step back
+        self.stock_value_daily.pop(day, None)
+        self.stock_value_daily[day] = self.total_stock_value()
+
+    def total_stock_value(self):
+        return sum(self.stock_value.values())
+
+    def stock_value_change(self):
+        # Percent change of the closing stock value vs the previous recorded day
+        days = reversed(self.stock_value_daily)
+        today = next(days, None)
+        previous = next(days, None)
+        if previous is None or not self.stock_value_daily[previous]:
+            return None
+        return (self.stock_value_daily[today] - self.stock_value_daily[previous]) / self.stock_value_daily[previous] * 100
+
+    def set_risk_counts(self, counts, day=None):
+        self.risk_counts = {level: int(counts.get(level, 0)) for level in ('High', 'Medium', 'Low')}
+        self._close_risk_counts(day)
+
+    def add_risk_counts(self, deltas, day=None):
+        for level, delta in deltas.items():
+            self.risk_counts[level] = self.risk_counts.get(level, 0) + int(delta)
+        self._close_risk_counts(day)
+
+    def _close_risk_counts(self, day):
+        day = (day or date.today()).isoformat()
+        self.risk_counts_daily.pop(day, None)
+        self.risk_counts_daily[day] = {level: self.risk_counts.get(level, 0) for level in ('High', 'Medium')}
+
+    def risk_count_deltas(self):
+        # Day-over-day change in the closing High/Medium product counts
+        days = reversed(self.risk_counts_daily)
+        today = next(days, None)
+        previous = next(days, None)
+        if previous is None:
+            return {'High': None, 'Medium': None}
+        return {level: self.risk_counts_daily[today][level] - self.risk_counts_daily[previous][level] for level in ('High', 'Medium')}
+
+    def daily_trend(self, days=7, end=None):
+        end = end or date.today()
+        trend = []
+        for offset in range(days - 1, -1, -1):
+            day = end - timedelta(days=offset)
+            counts = self.daily.get(day.isoformat(), _empty_counts())
+            trend.append({'date': day.isoformat(), 'day': day.strftime('%a'), 'reorders': counts['reorders'], 'units': counts['units']})
+        return trend
+
+    def weekly_trend(self, weeks=8, end=None):
+        end = end or date.today()
+        trend = []
+        for offset in range(weeks - 1, -1, -1):
+            week = _week_key(end - timedelta(weeks=offset))
+            counts = self.weekly.get(week, _empty_counts())
+            trend.append({'week': week, 'reorders': counts['reorders'], 'units': counts['units']})
+        return trend
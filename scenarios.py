@@ -0,0 +1,56 @@
+import pandas as pd
+import numpy as np
+from agent import DEFAULT_POLICY, RiskPolicy, score_risk
+
+SHOCK_COLUMNS = ['demand_shock', 'lead_time_shock']
+
+
+def scenario_grid(**values):
+    # Cartesian grid of scenarios. Keyword arguments are RiskPolicy fields or
+    # shocks (demand_shock, lead_time_shock multipliers), each a list of values;
+    # anything not given stays at the default policy / no shock.
+    columns = list(RiskPolicy._fields) + SHOCK_COLUMNS
+    unknown = set(values) - set(columns)
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters: {', '.join(sorted(unknown))}")
+
+    defaults = dict(DEFAULT_POLICY._asdict(), demand_shock=1.0, lead_time_shock=1.0)
+    axes = [np.atleast_1d(values.get(column, defaults[column])) for column in columns]
+    return pd.MultiIndex.from_product(axes, names=columns).to_frame(index=False)
+
+
+def run_scenarios(agent, scenarios, max_cells=4_000_000):
+    # Score the whole catalog against every scenario in one (products x scenarios)
+    # broadcast. Works on copies of the agent's inputs: live inventory and the
+    # decision log are never touched. Products are processed in row chunks so
+    # the matrix stays under max_cells.
+    inputs = agent.risk_inputs()
+    policy = RiskPolicy(*(scenarios[field].to_numpy(dtype=float)[None, :] for field in RiskPolicy._fields))
+    demand_shock = scenarios['demand_shock'].to_numpy(dtype=float)[None, :]
+    lead_time_shock = scenarios['lead_time_shock'].to_numpy(dtype=float)[None, :]
+
+    n_products = len(inputs['current_stock'])
+    n_scenarios = len(scenarios)
+    chunk = max(1, max_cells // max(n_scenarios, 1))
+    totals = {name: np.zeros(n_scenarios, dtype=np.int64)
+              for name in ('high_risk', 'medium_risk', 'reorder_units', 'capacity_breaches')}
+
+    for start in range(0, n_products, chunk):
+        rows = slice(start, start + chunk)
+        current_stock = inputs['current_stock'][rows, None]
+        max_capacity = inputs['max_capacity'][rows, None]
+        scores = score_risk(current_stock,
+                            inputs['daily_demand'][rows, None] * demand_shock,
+                            inputs['lead_time'][rows, None] * lead_time_shock,
+                            max_capacity, policy)
+
+        reorder_qty = scores['reorder_qty']
+        totals['high_risk'] += (scores['risk_code'] == 0).sum(axis=0)
+        totals['medium_risk'] += (scores['risk_code'] == 1).sum(axis=0)
+        totals['reorder_units'] += reorder_qty.sum(axis=0)
+        totals['capacity_breaches'] += ((reorder_qty > 0) & (current_stock + reorder_qty > max_capacity)).sum(axis=0)
+
+    results = scenarios.reset_index(drop=True).copy()
+    for name, values in totals.items():
+        results[name] = values
+    return results
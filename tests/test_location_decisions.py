@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import InventoryAgent
+from locations import LocationInventory
+
+
+def _agent(tmp_path):
+    inventory = tmp_path / 'inventory.csv'
+    demand = tmp_path / 'demand.csv'
+    pd.DataFrame({'product_id': ['P1'], 'product_name': ['Widget'], 'current_stock': [100],
+                  'max_capacity': [200], 'lead_time_days': [5]}).to_csv(inventory, index=False)
+    pd.DataFrame({'product_id': ['P1'], 'daily_demand': [1.0]}).to_csv(demand, index=False)
+    return InventoryAgent(str(inventory), str(demand), str(tmp_path / 'decisions.json'))
+
+
+def _network(current_stock):
+    inventory = pd.DataFrame({'product_id': ['P1', 'P1'], 'store_id': ['S1', 'S2'], 'product_name': ['Widget'] * 2,
+                              'current_stock': current_stock, 'max_capacity': [200, 200], 'lead_time_days': [5, 5]})
+    demand = pd.DataFrame({'product_id': ['P1', 'P1'], 'store_id': ['S1', 'S2'], 'daily_demand': [1.0, 1.0]})
+    return LocationInventory(inventory, demand)
+
+
+def test_healthy_network_round_trips(tmp_path):
+    agent = _agent(tmp_path)
+    assert agent.run_all_locations(_network([150, 150])).empty
+    agent.make_decision('P1')
+
+    # Reload with and without the rollup file so it is rebuilt from the log
+    for remove_rollups in (False, True):
+        if remove_rollups:
+            os.remove(tmp_path / 'decisions_rollups.json')
+        reloaded = _agent(tmp_path)
+        assert reloaded.get_location_decisions().empty
+
+
+def test_empty_logged_batch_loads_with_integer_columns(tmp_path):
+    agent = _agent(tmp_path)
+    # A log written before empty batches were skipped
+    agent._add_location_batch(dict(agent._empty_location_columns(), timestamp=0.0))
+    agent.save_decisions()
+    os.remove(tmp_path / 'decisions_rollups.json')
+
+    reloaded = _agent(tmp_path)
+    assert reloaded.get_location_decisions().empty
+    assert reloaded.location_decisions[0]['reason_id'].dtype.kind == 'i'
+
+    reloaded.run_all_locations(_network([1, 150]))
+    decisions = _agent(tmp_path).get_location_decisions('P1')
+    assert decisions['store_id'].tolist() == ['S1']
+    assert decisions['risk_level'].tolist() == ['High']